@@ -1,3 +1,8 @@
+import os
+import stat
+import tempfile
+import unicodedata
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side
@@ -5,13 +10,38 @@ from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
 from typing import Optional, Dict, Callable
 
-def calcular_balance(df: pd.DataFrame, callback: Optional[Callable] = None) -> pd.DataFrame:
+class OperacionCancelada(Exception):
+    pass
+
+def a_centavos(valores: pd.Series) -> pd.Series:
+    numericos = pd.to_numeric(valores, errors="coerce").fillna(0)
+    if pd.api.types.is_integer_dtype(numericos):
+        return numericos.astype("int64") * 100
+    # np.rint absorbe el error binario de x * 100 (p. ej. 0.29 * 100 = 28.999...)
+    return pd.Series(np.rint(numericos.to_numpy(dtype="float64") * 100).astype("int64"), index=valores.index)
+
+def de_centavos(centavos) -> float:
+    return int(centavos) / 100
+
+def es_balance_exacto(df_balance: pd.DataFrame, exacto: Optional[bool] = None) -> bool:
+    # Solo se interpreta "valor" en centavos si lo dice exacto o attrs["unidad"]; sin marca son unidades monetarias
+    if exacto is None:
+        return df_balance.attrs.get("unidad") == "centavos"
+    if exacto and not pd.api.types.is_integer_dtype(df_balance["valor"]):
+        raise ValueError("exacto=True requiere 'valor' en centavos (int64).")
+    return exacto
+
+def calcular_balance(df: pd.DataFrame, callback: Optional[Callable] = None, exacto: bool = False) -> pd.DataFrame:
+    # Con exacto=True "valor" se guarda como int64 en centavos y el resultado se marca en attrs["unidad"]
     required_columns = ["categoria", "tipo", "valor"]
     if not all(col in df.columns for col in required_columns):
         raise ValueError("DataFrame must contain 'categoria', 'tipo', 'valor' columns.")
 
     detailed_df = df[required_columns].copy()
-    detailed_df["valor"] = pd.to_numeric(detailed_df["valor"], errors="coerce").fillna(0)
+    if exacto:
+        detailed_df["valor"] = a_centavos(detailed_df["valor"])
+    else:
+        detailed_df["valor"] = pd.to_numeric(detailed_df["valor"], errors="coerce").fillna(0).astype("float64")
 
     category_sums = detailed_df.groupby(["categoria", "tipo"])["valor"].sum().reset_index()
 
@@ -29,6 +59,9 @@ def calcular_balance(df: pd.DataFrame, callback: Optional[Callable] = None) -> p
     summary_df = pd.DataFrame(summary_data)
 
     result_df = pd.concat([category_sums, summary_df], ignore_index=True)
+    if exacto:
+        result_df["valor"] = result_df["valor"].astype("int64")
+        result_df.attrs["unidad"] = "centavos"
 
     if callback:
         callback(result_df)
@@ -100,9 +133,14 @@ def exportar_balance_profesional(
     df_balance: pd.DataFrame,
     archivo_salida: str,
     ratios: Optional[Dict[str, float]] = None,
-    diagnostico: Optional[str] = None
+    diagnostico: Optional[str] = None,
+    progreso: Optional[Callable[[int], None]] = None,
+    exacto: Optional[bool] = None
 ) -> None:
+    # progreso recibe un porcentaje (0-100); puede lanzar OperacionCancelada para abortar
+    # exacto indica si "valor" está en centavos; si es None se toma de attrs["unidad"]
     try:
+        exacto = es_balance_exacto(df_balance, exacto)
         wb = Workbook()
         ws = wb.active
         ws.title = "Balance General"
@@ -138,10 +176,16 @@ def exportar_balance_profesional(
             cell.alignment = center
         fila += 1
 
-        for _, row in df_balance.iterrows():
+        total_filas = max(len(df_balance), 1)
+        for idx, (_, row) in enumerate(df_balance.iterrows()):
+            if progreso and idx % 50 == 0:
+                progreso(int(idx * 80 / total_filas))
             categoria = str(row["categoria"]).strip().title()
             tipo = str(row["tipo"]).strip().title()
-            valor = float(row["valor"]) if pd.notna(row["valor"]) else 0.0
+            if pd.isna(row["valor"]):
+                valor = 0.0
+            else:
+                valor = de_centavos(row["valor"]) if exacto else float(row["valor"])
 
             if categoria and categoria != current_category:
                 ws[f"A{fila}"] = categoria
@@ -199,8 +243,79 @@ def exportar_balance_profesional(
                 ws_diag[f"A{idx}"] = cleaned_line
             ws_diag.column_dimensions["A"].width = 60
 
-        wb.save(archivo_salida)
+        if progreso:
+            progreso(85)
+        guardar_atomico(wb, archivo_salida)
+    except OperacionCancelada:
+        raise
     except PermissionError:
         raise ValueError(f"No se puede escribir en {archivo_salida}. Verifica los permisos.")
     except Exception as e:
-        raise ValueError(f"Error al exportar el balance: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error al exportar el balance: {str(e)}")
+
+def guardar_atomico(wb: Workbook, archivo_salida: str) -> None:
+    # Escribe en un temporal del mismo directorio y lo renombra, para no dejar archivos a medias
+    directorio = os.path.dirname(os.path.abspath(archivo_salida))
+    temporal = None
+    try:
+        fd, temporal = tempfile.mkstemp(prefix=".corex_", suffix=".xlsx", dir=directorio)
+        os.close(fd)
+        wb.save(temporal)
+        # mkstemp crea el temporal con 0600; se restauran los permisos del archivo existente o los de la umask
+        if os.path.exists(archivo_salida):
+            modo = stat.S_IMODE(os.stat(archivo_salida).st_mode)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            modo = 0o666 & ~umask
+        os.chmod(temporal, modo)
+        os.replace(temporal, archivo_salida)
+    except BaseException as e:
+        if temporal and os.path.exists(temporal):
+            os.remove(temporal)
+        # El error se reporta contra el archivo destino, no contra el temporal oculto
+        if isinstance(e, OSError) and e.errno is not None:
+            raise type(e)(e.errno, e.strerror, archivo_salida) from e
+        raise
+
+def _normalizar_celda(valor) -> str:
+    if pd.isna(valor):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(valor).strip().lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def importar_balance(archivo: str) -> pd.DataFrame:
+    # Acepta la hoja "Balance General" que genera exportar_balance_profesional (encabezado Categoría/Tipo/Valor,
+    # categoría en su propia fila y cuentas debajo) o una hoja plana con columnas categoria, tipo, valor
+    try:
+        hoja = pd.read_excel(archivo, engine="openpyxl", header=None, dtype=object)
+    except PermissionError:
+        raise ValueError(f"No se puede leer {archivo}. Verifica los permisos.")
+    except Exception as e:
+        raise ValueError(f"Error al importar el balance: {str(e)}")
+
+    required_columns = ["categoria", "tipo", "valor"]
+    fila_encabezado = None
+    for idx, fila in enumerate(hoja.itertuples(index=False)):
+        encabezados = [_normalizar_celda(valor) for valor in fila]
+        if all(col in encabezados for col in required_columns):
+            fila_encabezado = idx
+            posiciones = [encabezados.index(col) for col in required_columns]
+            break
+    if fila_encabezado is None:
+        raise ValueError("El archivo debe contener las columnas 'categoria', 'tipo', 'valor'.")
+
+    df = hoja.iloc[fila_encabezado + 1:, posiciones].copy()
+    df.columns = required_columns
+    df["categoria"] = df["categoria"].map(_normalizar_celda)
+    df["tipo"] = df["tipo"].map(lambda valor: "" if pd.isna(valor) else str(valor).strip().lower())
+
+    # Las secciones de ratios y diagnóstico de la exportación cierran la tabla de cuentas
+    fin = df["categoria"].isin(["ratios financieros", "diagnostico financiero"]).to_numpy()
+    if fin.any():
+        df = df.iloc[:fin.argmax()]
+
+    df["categoria"] = df["categoria"].replace("", np.nan).ffill().fillna("")
+    df["valor"] = pd.to_numeric(df["valor"], errors="coerce").fillna(0).astype("float64")
+    df = df[(df["tipo"] != "") & (df["categoria"] != "totales")]
+    return df.reset_index(drop=True)
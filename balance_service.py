@@ -0,0 +1,245 @@
+import os
+import sys
+import stat
+import json
+import socket
+import argparse
+import http.client
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Optional, Dict, List
+from balance_engine import calcular_balance, calcular_ratios, generar_diagnostico, es_balance_exacto, de_centavos
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+TIPO_JSON = "application/json"
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+TAMANO_MAXIMO = 64 * 1024 * 1024
+
+def procesar_solicitud(datos: pd.DataFrame, exacto: bool = True) -> Dict:
+    balance = calcular_balance(datos, exacto=exacto)
+    ratios = calcular_ratios(balance)
+
+    valores = balance["valor"].tolist()
+    if es_balance_exacto(balance, exacto):
+        valores = [de_centavos(valor) for valor in valores]
+    else:
+        valores = [float(valor) for valor in valores]
+
+    totales = {
+        tipo: valor
+        for categoria, tipo, valor in zip(balance["categoria"], balance["tipo"], valores)
+        if categoria == "TOTALES"
+    }
+    return {
+        "balance": [
+            {"categoria": categoria, "tipo": tipo, "valor": valor}
+            for categoria, tipo, valor in zip(balance["categoria"], balance["tipo"], valores)
+        ],
+        "ratios": {nombre: float(valor) for nombre, valor in ratios.items()},
+        "totales": totales,
+        "diagnostico": generar_diagnostico(ratios, totales)
+    }
+
+def procesar_lote(solicitudes: List[Dict], exacto: bool = True) -> List[Dict]:
+    resultados = []
+    for indice, solicitud in enumerate(solicitudes):
+        identificador = indice
+        try:
+            identificador = solicitud.get("id", indice)
+            datos = pd.DataFrame(solicitud.get("datos", []))
+            if datos.empty and datos.columns.empty:
+                datos = pd.DataFrame(columns=["categoria", "tipo", "valor"])
+            exacto_solicitud = solicitud.get("exacto", exacto)
+            if not isinstance(exacto_solicitud, bool):
+                raise ValueError("'exacto' debe ser true o false")
+            resultado = procesar_solicitud(datos, exacto_solicitud)
+            resultado["id"] = identificador
+        except Exception as e:
+            resultado = {"id": identificador, "error": str(e)}
+        resultados.append(resultado)
+    return resultados
+
+def solicitudes_desde_arrow(cuerpo: bytes) -> List[Dict]:
+    # Tabla con columnas id, categoria, tipo, valor; cada id es una solicitud del lote
+    if pa is None:
+        raise ValueError("Arrow no disponible: instala pyarrow para enviar lotes en formato Arrow.")
+    tabla = pa.ipc.open_stream(cuerpo).read_all()
+    df = tabla.to_pandas()
+    if "id" not in df.columns:
+        raise ValueError("La tabla Arrow debe contener la columna 'id'.")
+    return [
+        {"id": identificador.item() if hasattr(identificador, "item") else identificador, "datos": grupo[["categoria", "tipo", "valor"]]}
+        for identificador, grupo in df.groupby("id", sort=False)
+    ]
+
+class BalanceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CoreXBalance/1.0"
+    # Cabeceras y cuerpo van en escrituras separadas; sin esto el ACK retardado añade ~40 ms por petición
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        if self.request.family == socket.AF_UNIX:
+            self.disable_nagle_algorithm = False
+        super().setup()
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def responder(self, estado: int, contenido: Dict) -> None:
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", f"{TIPO_JSON}; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        if self.path == "/salud":
+            self.responder(200, {"estado": "ok"})
+        else:
+            self.responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/balances":
+            self.responder(404, {"error": f"Ruta no encontrada: {self.path}"})
+            return
+
+        try:
+            longitud = int(self.headers.get("Content-Length") or 0)
+            if longitud < 0:
+                raise ValueError("Content-Length negativo")
+        except ValueError as e:
+            # Sin una longitud válida no se puede saber dónde acaba el cuerpo, así que se cierra la conexión
+            self.close_connection = True
+            self.responder(400, {"error": f"Content-Length no válido: {str(e)}"})
+            return
+        if longitud > TAMANO_MAXIMO:
+            self.close_connection = True
+            self.responder(413, {"error": "Solicitud demasiado grande."})
+            return
+        cuerpo = self.rfile.read(longitud)
+
+        try:
+            tipo = self.headers.get("Content-Type", TIPO_JSON).split(";")[0].strip()
+            if tipo == TIPO_ARROW:
+                solicitudes = solicitudes_desde_arrow(cuerpo)
+                exacto = True
+            else:
+                contenido = json.loads(cuerpo or b"{}")
+                exacto = contenido.get("exacto", True)
+                if "solicitudes" in contenido:
+                    solicitudes = contenido["solicitudes"]
+                else:
+                    solicitudes = [{"id": contenido.get("id", 0), "datos": contenido.get("datos", [])}]
+            if not isinstance(exacto, bool):
+                raise ValueError("'exacto' debe ser true o false")
+            if not isinstance(solicitudes, list) or not all(isinstance(solicitud, dict) for solicitud in solicitudes):
+                raise ValueError("'solicitudes' debe ser una lista de objetos")
+        except Exception as e:
+            self.responder(400, {"error": f"Solicitud no válida: {str(e)}"})
+            return
+
+        self.responder(200, {"resultados": procesar_lote(solicitudes, exacto)})
+
+class BalanceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    verbose = False
+
+class BalanceUnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    verbose = False
+
+    def server_bind(self):
+        # Solo se reutiliza la ruta si es un socket abandonado: nunca se borra un archivo normal
+        # ni el socket de otra instancia que siga escuchando
+        ruta = self.server_address
+        if os.path.lexists(ruta):
+            if not stat.S_ISSOCK(os.lstat(ruta).st_mode):
+                raise ValueError(f"{ruta} ya existe y no es un socket.")
+            prueba = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                prueba.connect(ruta)
+            except ConnectionRefusedError:
+                os.remove(ruta)
+            else:
+                raise ValueError(f"Ya hay un servicio escuchando en {ruta}.")
+            finally:
+                prueba.close()
+        super().server_bind()
+
+def crear_servidor(host: str = "127.0.0.1", puerto: int = 8765, socket_unix: Optional[str] = None, verbose: bool = False):
+    if socket_unix:
+        servidor = BalanceUnixServer(socket_unix, BalanceRequestHandler)
+    else:
+        servidor = BalanceHTTPServer((host, puerto), BalanceRequestHandler)
+    servidor.verbose = verbose
+    return servidor
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, ruta: str, timeout: float = 30):
+        super().__init__("localhost", timeout=timeout)
+        self.ruta = ruta
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.ruta)
+
+class ClienteBalance:
+    # Mantiene una única conexión keep-alive con el servicio
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 8765, socket_unix: Optional[str] = None, timeout: float = 30):
+        if socket_unix:
+            self.conn = UnixHTTPConnection(socket_unix, timeout=timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, puerto, timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        self.conn.close()
+
+    def calcular(self, solicitudes: List[Dict], exacto: bool = True) -> List[Dict]:
+        cuerpo = json.dumps({"solicitudes": solicitudes, "exacto": exacto}).encode("utf-8")
+        self.conn.request("POST", "/balances", body=cuerpo, headers={"Content-Type": TIPO_JSON})
+        respuesta = self.conn.getresponse()
+        contenido = json.loads(respuesta.read())
+        if respuesta.status != 200:
+            raise ValueError(contenido.get("error", f"Error HTTP {respuesta.status}"))
+        return contenido["resultados"]
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servicio local de cálculo de balances CoreX")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--socket", dest="socket_unix", help="Ruta de un socket Unix en lugar de TCP")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    servidor = crear_servidor(args.host, args.puerto, args.socket_unix, args.verbose)
+    destino = args.socket_unix or f"http://{args.host}:{args.puerto}"
+    print(f"CoreX escuchando en {destino}", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if args.socket_unix and os.path.exists(args.socket_unix):
+            os.remove(args.socket_unix)
+
+if __name__ == "__main__":
+    main()
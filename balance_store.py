@@ -0,0 +1,228 @@
+import sqlite3
+import datetime
+import pandas as pd
+from typing import Optional, Dict, Iterable, Tuple, List
+from balance_engine import a_centavos, es_balance_exacto
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    id INTEGER PRIMARY KEY,
+    empresa TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    creado TEXT NOT NULL,
+    UNIQUE (empresa, periodo)
+);
+CREATE TABLE IF NOT EXISTS cuentas (
+    balance_id INTEGER NOT NULL REFERENCES balances(id) ON DELETE CASCADE,
+    empresa TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    centavos INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ratios (
+    balance_id INTEGER NOT NULL REFERENCES balances(id) ON DELETE CASCADE,
+    empresa TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    valor REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cuentas_empresa_periodo ON cuentas (empresa, periodo);
+CREATE INDEX IF NOT EXISTS idx_cuentas_cuenta ON cuentas (empresa, categoria, tipo, periodo);
+CREATE INDEX IF NOT EXISTS idx_cuentas_balance ON cuentas (balance_id);
+CREATE INDEX IF NOT EXISTS idx_ratios_empresa_periodo ON ratios (empresa, periodo);
+CREATE INDEX IF NOT EXISTS idx_ratios_balance ON ratios (balance_id);
+"""
+
+def normalizar_periodo(periodo) -> str:
+    # Los periodos se guardan en ISO (AAAA-MM-DD) para que BETWEEN y ORDER BY respeten el orden cronológico
+    try:
+        if isinstance(periodo, (datetime.date, pd.Timestamp)):
+            return pd.Timestamp(periodo).strftime("%Y-%m-%d")
+        texto = str(periodo).strip()
+        fecha = pd.to_datetime(texto, format="ISO8601") if texto[:4].isdigit() else pd.to_datetime(texto, dayfirst=True)
+        return fecha.strftime("%Y-%m-%d")
+    except Exception:
+        raise ValueError(f"Periodo no válido: {periodo}")
+
+class BalanceStore:
+    def __init__(self, ruta: str = "corex_historico.db"):
+        self.ruta = ruta
+        self.conn = sqlite3.connect(ruta)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        self.conn.close()
+
+    def _insertar(
+        self,
+        empresa: str,
+        periodo: str,
+        df_balance: pd.DataFrame,
+        ratios: Optional[Dict[str, float]],
+        exacto: Optional[bool] = None
+    ) -> None:
+        periodo = normalizar_periodo(periodo)
+        self.conn.execute("DELETE FROM balances WHERE empresa = ? AND periodo = ?", (empresa, periodo))
+        cursor = self.conn.execute(
+            "INSERT INTO balances (empresa, periodo, creado) VALUES (?, ?, ?)",
+            (empresa, periodo, datetime.datetime.now().isoformat(timespec="seconds"))
+        )
+        balance_id = cursor.lastrowid
+
+        if es_balance_exacto(df_balance, exacto):
+            centavos = df_balance["valor"].astype("int64")
+        else:
+            centavos = a_centavos(df_balance["valor"])
+        filas = zip(
+            df_balance["categoria"].astype(str).tolist(),
+            df_balance["tipo"].astype(str).tolist(),
+            centavos.tolist()
+        )
+        self.conn.executemany(
+            "INSERT INTO cuentas (balance_id, empresa, periodo, categoria, tipo, centavos) VALUES (?, ?, ?, ?, ?, ?)",
+            ((balance_id, empresa, periodo, categoria, tipo, valor) for categoria, tipo, valor in filas)
+        )
+        if ratios:
+            self.conn.executemany(
+                "INSERT INTO ratios (balance_id, empresa, periodo, nombre, valor) VALUES (?, ?, ?, ?, ?)",
+                ((balance_id, empresa, periodo, nombre, float(valor)) for nombre, valor in ratios.items())
+            )
+
+    def guardar_balance(
+        self,
+        empresa: str,
+        periodo,
+        df_balance: pd.DataFrame,
+        ratios: Optional[Dict[str, float]] = None,
+        exacto: Optional[bool] = None
+    ) -> None:
+        # exacto indica si "valor" está en centavos; si es None se toma de attrs["unidad"]
+        with self.conn:
+            self._insertar(empresa, periodo, df_balance, ratios, exacto)
+
+    def guardar_balances(
+        self,
+        registros: Iterable[Tuple[str, object, pd.DataFrame, Optional[Dict[str, float]]]],
+        lote: int = 200,
+        exacto: Optional[bool] = None
+    ) -> int:
+        # Cada lote de balances se confirma en una sola transacción. Si un lote falla solo se revierte ese lote:
+        # los anteriores quedan guardados y el ValueError indica cuántos balances se confirmaron
+        total = 0
+        confirmados = 0
+        self.conn.execute("BEGIN")
+        try:
+            for empresa, periodo, df_balance, ratios in registros:
+                self._insertar(empresa, periodo, df_balance, ratios, exacto)
+                total += 1
+                if total - confirmados >= lote:
+                    self.conn.commit()
+                    confirmados = total
+                    self.conn.execute("BEGIN")
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            raise ValueError(
+                f"Error al guardar el balance n.º {total + 1}: {str(e)}. "
+                f"Se confirmaron {confirmados} balances; el lote en curso se revirtió."
+            ) from e
+        return total
+
+    def periodos(self, empresa: str) -> List[str]:
+        cursor = self.conn.execute("SELECT periodo FROM balances WHERE empresa = ? ORDER BY periodo", (empresa,))
+        return [fila[0] for fila in cursor.fetchall()]
+
+    def obtener_cuentas(
+        self,
+        empresa: str,
+        desde=None,
+        hasta=None,
+        categoria: Optional[str] = None,
+        tipo: Optional[str] = None,
+        exacto: bool = False
+    ) -> pd.DataFrame:
+        condiciones = ["empresa = ?"]
+        parametros: list = [empresa]
+        if desde is not None:
+            condiciones.append("periodo >= ?")
+            parametros.append(normalizar_periodo(desde))
+        if hasta is not None:
+            condiciones.append("periodo <= ?")
+            parametros.append(normalizar_periodo(hasta))
+        if categoria is not None:
+            condiciones.append("categoria = ?")
+            parametros.append(categoria)
+        if tipo is not None:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+
+        df = pd.read_sql_query(
+            f"SELECT periodo, categoria, tipo, centavos FROM cuentas WHERE {' AND '.join(condiciones)} ORDER BY periodo, rowid",
+            self.conn,
+            params=parametros
+        )
+        df = df.rename(columns={"centavos": "valor"})
+        if exacto:
+            df["valor"] = df["valor"].astype("int64")
+            df.attrs["unidad"] = "centavos"
+        else:
+            df["valor"] = df["valor"].astype("float64") / 100
+        return df
+
+    def obtener_balance(self, empresa: str, periodo, exacto: bool = False) -> pd.DataFrame:
+        df = self.obtener_cuentas(empresa, desde=periodo, hasta=periodo, exacto=exacto)
+        if df.empty:
+            raise ValueError(f"No hay balance guardado para {empresa} en {normalizar_periodo(periodo)}.")
+        return df.drop(columns="periodo").reset_index(drop=True)
+
+    def obtener_ratios(self, empresa: str, desde=None, hasta=None) -> pd.DataFrame:
+        condiciones = ["empresa = ?"]
+        parametros: list = [empresa]
+        if desde is not None:
+            condiciones.append("periodo >= ?")
+            parametros.append(normalizar_periodo(desde))
+        if hasta is not None:
+            condiciones.append("periodo <= ?")
+            parametros.append(normalizar_periodo(hasta))
+        df = pd.read_sql_query(
+            f"SELECT periodo, nombre, valor FROM ratios WHERE {' AND '.join(condiciones)}",
+            self.conn,
+            params=parametros
+        )
+        return df.pivot(index="periodo", columns="nombre", values="valor").sort_index()
+
+    def comparar_periodos(self, empresa: str, periodo, anteriores: int = 1, exacto: bool = False) -> pd.DataFrame:
+        periodo = normalizar_periodo(periodo)
+        cursor = self.conn.execute(
+            "SELECT periodo FROM balances WHERE empresa = ? AND periodo <= ? ORDER BY periodo DESC LIMIT ?",
+            (empresa, periodo, anteriores + 1)
+        )
+        seleccion = sorted(fila[0] for fila in cursor.fetchall())
+        if not seleccion or seleccion[-1] != periodo:
+            raise ValueError(f"No hay balance guardado para {empresa} en {periodo}.")
+
+        df = self.obtener_cuentas(empresa, desde=seleccion[0], hasta=periodo, exacto=exacto)
+        df = df[df["periodo"].isin(seleccion)]
+        comparativo = df.pivot_table(
+            index=["categoria", "tipo"], columns="periodo", values="valor", aggfunc="sum", fill_value=0, sort=False
+        )
+        comparativo = comparativo.reindex(columns=seleccion, fill_value=0)
+        comparativo.columns.name = None
+        if len(seleccion) > 1:
+            actual = comparativo[seleccion[-1]]
+            previo = comparativo[seleccion[-2]]
+            comparativo["variacion"] = actual - previo
+            comparativo["variacion_pct"] = (comparativo["variacion"] / previo.where(previo != 0)).mul(100).round(2)
+        if exacto:
+            comparativo.attrs["unidad"] = "centavos"
+        return comparativo.reset_index()
@@ -0,0 +1,59 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from balance_engine import calcular_balance, calcular_ratios, de_centavos
+from escenarios import evaluar_escenarios
+
+CATEGORIAS = ["activos corrientes", "activos no corrientes", "pasivos corrientes", "pasivos no corrientes", "patrimonio"]
+
+def generar_libro(filas: int, semilla: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    centavos = rng.integers(1, 100_000_000, size=filas)
+    return pd.DataFrame({
+        "categoria": rng.choice(CATEGORIAS, size=filas),
+        "tipo": [f"cuenta {i % 500}" for i in range(filas)],
+        "valor": centavos / 100
+    })
+
+def medir(funcion, repeticiones: int = 5) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+def totales(balance: pd.DataFrame) -> dict:
+    filas = balance[balance["categoria"] == "TOTALES"].set_index("tipo")["valor"]
+    return filas.to_dict()
+
+def medir_escenarios(df: pd.DataFrame, escenarios: int = 10_000) -> float:
+    rng = np.random.default_rng(1)
+    balance = calcular_balance(df, exacto=True)
+    shocks = pd.DataFrame({
+        "activos corrientes": -rng.uniform(0, 0.5, size=escenarios),
+        "pasivos corrientes": rng.uniform(0, 0.5, size=escenarios)
+    })
+    return medir(lambda: evaluar_escenarios(balance, shocks))
+
+def main(filas: int = 1_000_000) -> None:
+    df = generar_libro(filas)
+    t_float = medir(lambda: calcular_ratios(calcular_balance(df)))
+    t_exacto = medir(lambda: calcular_ratios(calcular_balance(df, exacto=True)))
+
+    flotante = totales(calcular_balance(df))
+    exacto = totales(calcular_balance(df, exacto=True))
+    patrimonio_float = flotante["Total Activos"] - flotante["Total Pasivos"]
+    patrimonio_exacto = exacto["Total Activos"] - exacto["Total Pasivos"]
+
+    print(f"Filas: {filas:,}")
+    print(f"float64:          {t_float * 1000:8.1f} ms")
+    print(f"centavos (int64): {t_exacto * 1000:8.1f} ms  ({t_exacto / t_float:.2f}x)")
+    for clave in ["Total Activos", "Total Pasivos"]:
+        print(f"{clave}: float={flotante[clave]!r} exacto={de_centavos(exacto[clave]):.2f}")
+    print(f"Total Patrimonio: float={patrimonio_float!r} exacto={de_centavos(patrimonio_exacto):.2f}")
+    print(f"10,000 escenarios de estrés: {medir_escenarios(df) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
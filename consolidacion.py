@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict, Union
+from balance_engine import calcular_balance, calcular_ratios, a_centavos, es_balance_exacto
+
+CUENTA_MINORITARIOS = ("patrimonio", "participaciones no controladoras")
+
+def _unir_balances(balances: Union[pd.DataFrame, Dict[str, pd.DataFrame]], exacto: Optional[bool]) -> pd.DataFrame:
+    if isinstance(balances, dict):
+        partes = []
+        for entidad, df in balances.items():
+            parte = df[["categoria", "tipo", "valor"]].copy()
+            parte["valor"] = parte["valor"].astype("int64") if es_balance_exacto(df, exacto) else a_centavos(parte["valor"])
+            parte.insert(0, "entidad", entidad)
+            partes.append(parte)
+        if not partes:
+            raise ValueError("No hay balances para consolidar.")
+        df = pd.concat(partes, ignore_index=True)
+    else:
+        required_columns = ["entidad", "categoria", "tipo", "valor"]
+        if not all(col in balances.columns for col in required_columns):
+            raise ValueError("DataFrame must contain 'entidad', 'categoria', 'tipo', 'valor' columns.")
+        df = balances[required_columns].copy()
+        df["valor"] = df["valor"].astype("int64") if es_balance_exacto(balances, exacto) else a_centavos(df["valor"])
+
+    # Las filas TOTALES de calcular_balance se recalculan tras consolidar
+    df = df[df["categoria"] != "TOTALES"]
+    df["categoria"] = df["categoria"].astype(str).str.strip().str.lower()
+    df["tipo"] = df["tipo"].astype(str).str.strip().str.lower()
+    return df.groupby(["entidad", "categoria", "tipo"], as_index=False, sort=False)["valor"].sum()
+
+def consolidar_grupo(
+    balances: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+    participaciones: Optional[pd.DataFrame] = None,
+    intercompania: Optional[pd.DataFrame] = None,
+    exacto: Optional[bool] = None
+) -> Dict[str, object]:
+    # balances: dict entidad -> balance, o DataFrame largo con columna 'entidad'
+    # participaciones: entidad, participacion (fracción 0-1 de la matriz; las entidades ausentes se integran al 100%)
+    # intercompania: entidad, categoria, tipo, valor a eliminar de la cuenta de esa entidad. La inversión de la
+    # matriz se elimina aquí contra la parte de la matriz en el patrimonio de la subsidiaria (participación x patrimonio)
+    # exacto: si los balances vienen en centavos; si es None se toma de attrs["unidad"] de cada uno
+    cuentas = _unir_balances(balances, exacto)
+
+    if intercompania is not None and not intercompania.empty:
+        required_columns = ["entidad", "categoria", "tipo", "valor"]
+        if not all(col in intercompania.columns for col in required_columns):
+            raise ValueError("Intercompany DataFrame must contain 'entidad', 'categoria', 'tipo', 'valor' columns.")
+        eliminaciones = intercompania[required_columns].copy()
+        eliminaciones["categoria"] = eliminaciones["categoria"].astype(str).str.strip().str.lower()
+        eliminaciones["tipo"] = eliminaciones["tipo"].astype(str).str.strip().str.lower()
+        eliminaciones["valor"] = a_centavos(eliminaciones["valor"])
+        eliminaciones = eliminaciones.groupby(["entidad", "categoria", "tipo"], as_index=False, sort=False)["valor"].sum()
+
+        cuentas = cuentas.merge(
+            eliminaciones.rename(columns={"valor": "eliminacion"}),
+            on=["entidad", "categoria", "tipo"],
+            how="outer",
+            indicator=True
+        )
+        huerfanas = cuentas[cuentas["_merge"] == "right_only"]
+        if not huerfanas.empty:
+            detalle = ", ".join(f"{e}/{c}/{t}" for e, c, t in huerfanas[["entidad", "categoria", "tipo"]].head(5).itertuples(index=False))
+            raise ValueError(f"Eliminaciones sobre cuentas inexistentes: {detalle}")
+        cuentas = cuentas.drop(columns="_merge")
+        cuentas["eliminacion"] = cuentas["eliminacion"].fillna(0).astype("int64")
+        cuentas["valor"] = cuentas["valor"].astype("int64")
+    else:
+        cuentas["eliminacion"] = np.zeros(len(cuentas), dtype="int64")
+
+    cuentas["neto"] = cuentas["valor"] - cuentas["eliminacion"]
+
+    if participaciones is not None and not participaciones.empty:
+        if not all(col in participaciones.columns for col in ["entidad", "participacion"]):
+            raise ValueError("Ownership DataFrame must contain 'entidad', 'participacion' columns.")
+        porcentajes = pd.to_numeric(participaciones["participacion"], errors="coerce")
+        if porcentajes.isna().any() or ((porcentajes < 0) | (porcentajes > 1)).any():
+            raise ValueError("La participación debe ser un número entre 0 y 1.")
+        duplicadas = participaciones["entidad"][participaciones["entidad"].duplicated()].unique()
+        if len(duplicadas):
+            raise ValueError(f"Entidades repetidas en participaciones: {', '.join(map(str, duplicadas[:5]))}")
+        mapa = pd.Series(porcentajes.to_numpy(), index=participaciones["entidad"])
+        participacion = cuentas["entidad"].map(mapa).fillna(1.0).to_numpy(dtype="float64")
+    else:
+        participacion = np.ones(len(cuentas), dtype="float64")
+
+    categorias = cuentas["categoria"]
+    es_patrimonio = categorias.str.contains("patrimonio", regex=False).to_numpy()
+    cuentas["seccion"] = np.select(
+        [categorias.str.contains("activos", regex=False).to_numpy(), categorias.str.contains("pasivos", regex=False).to_numpy(), es_patrimonio],
+        ["activos", "pasivos", "patrimonio"],
+        default="otros"
+    )
+    # La parte minoritaria sale del patrimonio antes de eliminaciones: la eliminación de la inversión solo
+    # consume la parte de la matriz, y calcularla sobre el neto la descontaría dos veces
+    minoritario = np.where(es_patrimonio, np.rint(cuentas["valor"].to_numpy() * (1.0 - participacion)), 0).astype("int64")
+    cuentas["minoritario"] = minoritario
+    cuentas["grupo"] = cuentas["neto"] - cuentas["minoritario"]
+
+    consolidado = cuentas.groupby(["categoria", "tipo"], as_index=False, sort=False)["grupo"].sum()
+    consolidado = consolidado.rename(columns={"grupo": "valor"})
+    total_minoritario = int(minoritario.sum())
+    if total_minoritario:
+        fila = pd.DataFrame({"categoria": [CUENTA_MINORITARIOS[0]], "tipo": [CUENTA_MINORITARIOS[1]], "valor": [total_minoritario]})
+        consolidado = pd.concat([consolidado, fila], ignore_index=True)
+    consolidado["valor"] = consolidado["valor"].astype("int64") / 100
+
+    balance = calcular_balance(consolidado, exacto=True)
+    por_entidad = cuentas.groupby(["entidad", "seccion"], sort=False)[["valor", "eliminacion", "minoritario", "grupo"]].sum()
+    return {
+        "balance": balance,
+        "ratios": calcular_ratios(balance),
+        "detalle": cuentas,
+        "por_entidad": por_entidad
+    }
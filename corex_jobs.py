@@ -0,0 +1,72 @@
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from balance_engine import (
+    calcular_balance, calcular_ratios, exportar_balance_profesional, generar_diagnostico,
+    importar_balance, OperacionCancelada
+)
+
+class JobSignals(QObject):
+    progreso = pyqtSignal(int, str)
+    terminado = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelado = pyqtSignal()
+
+class BalanceJob(QRunnable):
+    def __init__(self, tarea, *args, **kwargs):
+        super().__init__()
+        self.tarea = tarea
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self._cancelar = threading.Event()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def esta_cancelado(self):
+        return self._cancelar.is_set()
+
+    def reportar(self, porcentaje, mensaje=""):
+        if self._cancelar.is_set():
+            raise OperacionCancelada()
+        self.signals.progreso.emit(int(porcentaje), mensaje)
+
+    def run(self):
+        try:
+            resultado = self.tarea(self, *self.args, **self.kwargs)
+        except OperacionCancelada:
+            self.signals.cancelado.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.terminado.emit(resultado)
+
+def tarea_exportar(job, nombre_empresa, fecha_balance, df_datos, archivo):
+    job.reportar(0, "Calculando balance...")
+    balance = calcular_balance(df_datos, exacto=True)
+    ratios = calcular_ratios(balance)
+    diagnostico = generar_diagnostico(ratios)
+    job.reportar(10, "Exportando a Excel...")
+    exportar_balance_profesional(
+        nombre_empresa,
+        fecha_balance,
+        balance,
+        archivo,
+        ratios,
+        diagnostico,
+        progreso=lambda pct: job.reportar(10 + pct * 0.9, "Exportando a Excel..."),
+        exacto=True
+    )
+    # El archivo ya está en su sitio: se emite directamente para que una cancelación tardía no lo contradiga
+    job.signals.progreso.emit(100, "Balance guardado")
+    return {"archivo": archivo, "balance": balance, "ratios": ratios}
+
+def tarea_importar(job, archivo):
+    job.reportar(0, "Leyendo archivo...")
+    datos = importar_balance(archivo)
+    job.reportar(100, "Archivo leído")
+    return {"archivo": archivo, "datos": datos}
+
+def iniciar_job(job: BalanceJob, pool: QThreadPool = None) -> BalanceJob:
+    (pool or QThreadPool.globalInstance()).start(job)
+    return job
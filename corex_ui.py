@@ -3,11 +3,13 @@ import pandas as pd
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView, QLineEdit,
-    QStyledItemDelegate, QFileDialog
+    QStyledItemDelegate, QFileDialog, QProgressBar
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-from balance_engine import calcular_balance, calcular_ratios, exportar_balance_profesional, generar_diagnostico
+from balance_engine import calcular_balance, calcular_ratios, generar_diagnostico, de_centavos
+from corex_jobs import BalanceJob, tarea_exportar, tarea_importar, iniciar_job
+from indice_cuentas import IndiceCuentas
 
 class CustomDelegate(QStyledItemDelegate):
     def createEditor(self, parent, option, index):
@@ -60,6 +62,9 @@ class CoreXUI(QWidget):
         self.manual_data = pd.DataFrame(columns=["categoria", "tipo", "valor"], dtype=object)
         self.manual_data["valor"] = self.manual_data["valor"].astype("float64")
         self.balance_final = None
+        self.job_actual = None
+        self.indice_cuentas = IndiceCuentas()
+        self.filas_visibles = set()
         self.init_ui()
 
     def init_ui(self):
@@ -97,11 +102,34 @@ class CoreXUI(QWidget):
         self.btn_generar.setToolTip("Calcular balance, totales y análisis financiero")
         self.btn_guardar = self.crear_boton("💾 Guardar en Excel", "#dc3545", font_button, self.guardar_balance)
         self.btn_guardar.setToolTip("Exportar balance a Excel")
+        self.btn_cargar = self.crear_boton("📂 Cargar desde Excel", "#28a745", font_button, self.cargar_balance)
+        self.btn_cargar.setToolTip("Importar un balance guardado con CoreX o un Excel con columnas categoria, tipo, valor")
 
         button_layout.addWidget(self.btn_generar)
         button_layout.addWidget(self.btn_guardar)
+        button_layout.addWidget(self.btn_cargar)
         layout.addLayout(button_layout)
 
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFont(font_label)
+        self.progress_bar.setVisible(False)
+        progress_layout.addWidget(self.progress_bar)
+        self.btn_cancelar = self.crear_boton("✖ Cancelar", "#6c757d", font_label, self.cancelar_job)
+        self.btn_cancelar.setMinimumHeight(30)
+        self.btn_cancelar.setVisible(False)
+        progress_layout.addWidget(self.btn_cancelar)
+        layout.addLayout(progress_layout)
+
+        self.input_buscar = QLineEdit()
+        self.input_buscar.setPlaceholderText("🔍 Buscar cuenta (categoría, tipo o código)")
+        self.input_buscar.setFont(font_label)
+        self.input_buscar.setToolTip("Filtra las filas de la tabla mientras escribes")
+        self.input_buscar.setClearButtonEnabled(True)
+        self.input_buscar.textChanged.connect(self.filtrar_cuentas)
+        layout.addWidget(self.input_buscar)
+
         self.table = QTableWidget()
         self.table.setFont(font_table)
         self.table.setColumnCount(3)
@@ -235,6 +263,38 @@ class CoreXUI(QWidget):
             else:
                 self.table.setRowHeight(row, 35)
 
+        self.construir_indice()
+
+    def construir_indice(self):
+        self.indice_cuentas = IndiceCuentas()
+        fila_seccion = None
+        fila_categoria = None
+        for row in range(self.table.rowCount()):
+            categoria = self.table.item(row, 0).text().strip() if self.table.item(row, 0) else ""
+            tipo = self.table.item(row, 1).text().strip() if self.table.item(row, 1) else ""
+
+            if categoria in ["ACTIVOS", "PASIVOS", "PATRIMONIO", "TOTALES"]:
+                fila_seccion, fila_categoria = row, None
+                self.indice_cuentas.agregar(row, [categoria])
+            elif categoria:
+                fila_categoria = row
+                padres = (fila_seccion,) if fila_seccion is not None else ()
+                self.indice_cuentas.agregar(row, [categoria, self.table.item(fila_seccion, 0).text() if fila_seccion is not None else ""], padres)
+            else:
+                # Las cuentas heredan los términos de su categoría y sección para poder buscar "pasivos corrientes"
+                padres = tuple(fila for fila in (fila_seccion, fila_categoria) if fila is not None)
+                textos = [tipo] + [self.table.item(fila, 0).text() for fila in padres]
+                self.indice_cuentas.agregar(row, textos, padres)
+
+        self.filas_visibles = set(range(self.table.rowCount()))
+
+    def filtrar_cuentas(self, texto):
+        visibles = self.indice_cuentas.filas_visibles(texto)
+        # Solo se tocan las filas que cambian de estado, no toda la tabla
+        for row in self.filas_visibles ^ visibles:
+            self.table.setRowHidden(row, row not in visibles)
+        self.filas_visibles = visibles
+
     def on_item_changed(self, item):
         if item.column() == 2:
             try:
@@ -338,15 +398,15 @@ class CoreXUI(QWidget):
                 df_combined = pd.DataFrame(columns=["categoria", "tipo", "valor"], dtype=object)
                 df_combined["valor"] = df_combined["valor"].astype("float64")
 
-            self.balance_final = calcular_balance(df_combined)
+            self.balance_final = calcular_balance(df_combined, exacto=True)
             ratios = calcular_ratios(self.balance_final)
 
             self.table.blockSignals(True)
             total_rows = {
-                "Total Activos": 0.0,
-                "Total Pasivos": 0.0,
-                "Total Patrimonio": 0.0,
-                "Total Pasivos + Patrimonio": 0.0
+                "Total Activos": 0,
+                "Total Pasivos": 0,
+                "Total Patrimonio": 0,
+                "Total Pasivos + Patrimonio": 0
             }
             for _, row in self.balance_final[self.balance_final["categoria"] == "TOTALES"].iterrows():
                 if row["tipo"] == "Total Activos":
@@ -354,17 +414,17 @@ class CoreXUI(QWidget):
                 elif row["tipo"] == "Total Pasivos":
                     total_rows["Total Pasivos"] = row["valor"]
 
-            # Calcular Patrimonio como Total Activos - Total Pasivos
+            # Calcular Patrimonio como Total Activos - Total Pasivos (en centavos, sin deriva de redondeo)
             total_rows["Total Patrimonio"] = total_rows["Total Activos"] - total_rows["Total Pasivos"]
             # Verificar que la ecuación contable se cumpla
             total_rows["Total Pasivos + Patrimonio"] = total_rows["Total Pasivos"] + total_rows["Total Patrimonio"]
 
             category_totals = {
-                "activos corrientes": 0.0,
-                "activos no corrientes": 0.0,
-                "pasivos corrientes": 0.0,
-                "pasivos no corrientes": 0.0,
-                "patrimonio": 0.0
+                "activos corrientes": 0,
+                "activos no corrientes": 0,
+                "pasivos corrientes": 0,
+                "pasivos no corrientes": 0,
+                "patrimonio": 0
             }
             for _, row in self.balance_final.iterrows():
                 categoria = row["categoria"].lower()
@@ -376,13 +436,13 @@ class CoreXUI(QWidget):
                 table_tipo = self.table.item(row, 1)
                 if table_categoria and table_tipo and not table_tipo.text():
                     if table_categoria.text().lower() in category_totals:
-                        item_valor = QTableWidgetItem(f"${category_totals[table_categoria.text().lower()]:,.2f}")
+                        item_valor = QTableWidgetItem(f"${de_centavos(category_totals[table_categoria.text().lower()]):,.2f}")
                         item_valor.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                         item_valor.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
                         item_valor.setBackground(QColor("#f5f5f5"))
                         self.table.setItem(row, 2, item_valor)
                 elif table_categoria and table_tipo and table_tipo.text() in total_rows:
-                    valor = total_rows[table_tipo.text()]
+                    valor = de_centavos(total_rows[table_tipo.text()])
                     item = self.table.item(row, 2)
                     if item:
                         item.setText(f"${valor:,.2f}")
@@ -391,7 +451,7 @@ class CoreXUI(QWidget):
 
             self.table.blockSignals(False)
 
-            diagnostico = generar_diagnostico(ratios, total_rows)
+            diagnostico = generar_diagnostico(ratios, {k: de_centavos(v) for k, v in total_rows.items()})
             self.diagnostico_label.setText(diagnostico)
             self.diagnostico_label.setTextFormat(Qt.RichText)
         except Exception as e:
@@ -404,13 +464,13 @@ class CoreXUI(QWidget):
                 df_combined = pd.DataFrame(columns=["categoria", "tipo", "valor"], dtype=object)
                 df_combined["valor"] = df_combined["valor"].astype("float64")
 
-            self.balance_final = calcular_balance(df_combined)
+            self.balance_final = calcular_balance(df_combined, exacto=True)
             ratios = calcular_ratios(self.balance_final)
             total_rows = {
-                "Total Activos": 0.0,
-                "Total Pasivos": 0.0,
-                "Total Patrimonio": 0.0,
-                "Total Pasivos + Patrimonio": 0.0
+                "Total Activos": 0,
+                "Total Pasivos": 0,
+                "Total Patrimonio": 0,
+                "Total Pasivos + Patrimonio": 0
             }
             for _, row in self.balance_final[self.balance_final["categoria"] == "TOTALES"].iterrows():
                 if row["tipo"] == "Total Activos":
@@ -418,18 +478,18 @@ class CoreXUI(QWidget):
                 elif row["tipo"] == "Total Pasivos":
                     total_rows["Total Pasivos"] = row["valor"]
 
-            # Calcular Patrimonio como Total Activos - Total Pasivos
+            # Calcular Patrimonio como Total Activos - Total Pasivos (en centavos, sin deriva de redondeo)
             total_rows["Total Patrimonio"] = total_rows["Total Activos"] - total_rows["Total Pasivos"]
             # Verificar que la ecuación contable se cumpla
             total_rows["Total Pasivos + Patrimonio"] = total_rows["Total Pasivos"] + total_rows["Total Patrimonio"]
 
             self.table.blockSignals(True)
             category_totals = {
-                "activos corrientes": 0.0,
-                "activos no corrientes": 0.0,
-                "pasivos corrientes": 0.0,
-                "pasivos no corrientes": 0.0,
-                "patrimonio": 0.0
+                "activos corrientes": 0,
+                "activos no corrientes": 0,
+                "pasivos corrientes": 0,
+                "pasivos no corrientes": 0,
+                "patrimonio": 0
             }
             for _, row in self.balance_final.iterrows():
                 categoria = row["categoria"].lower()
@@ -439,7 +499,7 @@ class CoreXUI(QWidget):
                     table_categoria = self.table.item(table_row, 0)
                     table_tipo = self.table.item(table_row, 1)
                     if table_categoria and table_tipo and table_categoria.text().lower() == categoria and table_tipo.text().lower() == tipo:
-                        item_valor = QTableWidgetItem(f"${valor:,.2f}")
+                        item_valor = QTableWidgetItem(f"${de_centavos(valor):,.2f}")
                         item_valor.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                         if "total" not in tipo:
                             item_valor.setFlags(Qt.ItemIsEditable | Qt.ItemIsSelectable | Qt.ItemIsEnabled)
@@ -456,7 +516,7 @@ class CoreXUI(QWidget):
                 table_tipo = self.table.item(table_row, 1)
                 if table_categoria and table_tipo and not table_tipo.text():
                     if table_categoria.text().lower() in category_totals:
-                        item_valor = QTableWidgetItem(f"${category_totals[table_categoria.text().lower()]:,.2f}")
+                        item_valor = QTableWidgetItem(f"${de_centavos(category_totals[table_categoria.text().lower()]):,.2f}")
                         item_valor.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                         item_valor.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
                         item_valor.setBackground(QColor("#f5f5f5"))
@@ -464,7 +524,7 @@ class CoreXUI(QWidget):
 
             self.table.blockSignals(False)
 
-            diagnostico = generar_diagnostico(ratios, total_rows)
+            diagnostico = generar_diagnostico(ratios, {k: de_centavos(v) for k, v in total_rows.items()})
             self.diagnostico_label.setText(diagnostico)
             self.diagnostico_label.setTextFormat(Qt.RichText)
             QMessageBox.information(self, "Éxito", "Balance generado correctamente.")
@@ -479,29 +539,121 @@ class CoreXUI(QWidget):
             QMessageBox.warning(self, "Campo requerido", "Por favor ingresa el nombre de la empresa y la fecha del balance.")
             return
 
-        try:
-            df_combined = self.manual_data.copy()
-            if df_combined.empty:
-                df_combined = pd.DataFrame(columns=["categoria", "tipo", "valor"], dtype=object)
-                df_combined["valor"] = df_combined["valor"].astype("float64")
+        archivo, _ = QFileDialog.getSaveFileName(self, "Guardar Balance", "", "Excel (*.xlsx)")
+        if not archivo:
+            return
 
-            self.balance_final = calcular_balance(df_combined)
-            ratios = calcular_ratios(self.balance_final)
-            diagnostico = generar_diagnostico(ratios)
-
-            archivo, _ = QFileDialog.getSaveFileName(self, "Guardar Balance", "", "Excel (*.xlsx)")
-            if archivo:
-                exportar_balance_profesional(
-                    nombre_empresa,
-                    fecha_balance,
-                    self.balance_final,
-                    archivo,
-                    ratios,
-                    diagnostico
-                )
-                QMessageBox.information(self, "Éxito", f"Balance guardado en:\n{archivo}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo guardar el archivo: {str(e)}")
+        df_combined = self.manual_data.copy()
+        if df_combined.empty:
+            df_combined = pd.DataFrame(columns=["categoria", "tipo", "valor"], dtype=object)
+            df_combined["valor"] = df_combined["valor"].astype("float64")
+
+        job = BalanceJob(tarea_exportar, nombre_empresa, fecha_balance, df_combined, archivo)
+        job.signals.terminado.connect(self.on_exportacion_terminada)
+        job.signals.error.connect(lambda mensaje: self.on_job_error("No se pudo guardar el archivo", mensaje))
+        self.lanzar_job(job)
+
+    def cargar_balance(self):
+        archivo, _ = QFileDialog.getOpenFileName(self, "Cargar Balance", "", "Excel (*.xlsx)")
+        if not archivo:
+            return
+
+        job = BalanceJob(tarea_importar, archivo)
+        job.signals.terminado.connect(self.on_importacion_terminada)
+        job.signals.error.connect(lambda mensaje: self.on_job_error("No se pudo cargar el archivo", mensaje))
+        self.lanzar_job(job)
+
+    def lanzar_job(self, job):
+        if self.job_actual is not None:
+            QMessageBox.warning(self, "Operación en curso", "Espera a que termine la operación actual o cancélala.")
+            return
+        job.signals.progreso.connect(self.on_job_progreso)
+        job.signals.cancelado.connect(self.on_job_cancelado)
+        self.job_actual = job
+        self.set_job_en_curso(True)
+        iniciar_job(job)
+
+    def cancelar_job(self):
+        if self.job_actual is not None:
+            self.job_actual.cancelar()
+            self.btn_cancelar.setEnabled(False)
+
+    def set_job_en_curso(self, en_curso):
+        self.btn_generar.setEnabled(not en_curso)
+        self.btn_guardar.setEnabled(not en_curso)
+        self.btn_cargar.setEnabled(not en_curso)
+        self.table.setEnabled(not en_curso)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setVisible(en_curso)
+        self.btn_cancelar.setEnabled(en_curso)
+        self.btn_cancelar.setVisible(en_curso)
+        if not en_curso:
+            self.job_actual = None
+
+    def on_job_progreso(self, porcentaje, mensaje):
+        self.progress_bar.setValue(porcentaje)
+        if mensaje:
+            self.progress_bar.setFormat(f"{mensaje} %p%")
+
+    def on_job_cancelado(self):
+        self.set_job_en_curso(False)
+        QMessageBox.information(self, "Cancelado", "La operación fue cancelada.")
+
+    def on_job_error(self, titulo, mensaje):
+        self.set_job_en_curso(False)
+        QMessageBox.critical(self, "Error", f"{titulo}: {mensaje}")
+
+    def on_exportacion_terminada(self, resultado):
+        self.set_job_en_curso(False)
+        self.balance_final = resultado["balance"]
+        QMessageBox.information(self, "Éxito", f"Balance guardado en:\n{resultado['archivo']}")
+
+    def on_importacion_terminada(self, resultado):
+        self.set_job_en_curso(False)
+        valores = {
+            (row["categoria"], row["tipo"]): row["valor"]
+            for _, row in resultado["datos"].iterrows()
+        }
+
+        # Se parte de cero para que las cuentas ausentes del archivo no conserven valores anteriores
+        self.table.blockSignals(True)
+        cargadas = set()
+        current_category = ""
+        for row in range(self.table.rowCount()):
+            categoria_item = self.table.item(row, 0)
+            tipo_item = self.table.item(row, 1)
+            valor_item = self.table.item(row, 2)
+            if not categoria_item or not tipo_item or not valor_item:
+                continue
+
+            categoria = categoria_item.text().strip()
+            tipo = tipo_item.text().strip()
+            if categoria and categoria not in ["ACTIVOS", "PASIVOS", "PATRIMONIO", "TOTALES"]:
+                current_category = categoria.lower()
+
+            if tipo and valor_item.flags() & Qt.ItemIsEditable:
+                clave = (current_category, tipo.lower())
+                valor = valores.get(clave, 0.0)
+                valor_item.setText(f"${valor:,.2f}")
+                if clave in valores:
+                    cargadas.add(clave)
+        self.table.blockSignals(False)
+
+        self.update_table_and_totals()
+        sin_cargar = [clave for clave in valores if clave not in cargadas]
+        if sin_cargar:
+            detalle = "\n".join(f"• {categoria} / {tipo}" for categoria, tipo in sin_cargar[:15])
+            if len(sin_cargar) > 15:
+                detalle += f"\n… y {len(sin_cargar) - 15} más"
+            QMessageBox.warning(
+                self,
+                "Carga parcial",
+                f"Balance cargado desde:\n{resultado['archivo']}\n\n"
+                f"Estas cuentas no existen en la tabla y no se cargaron:\n{detalle}"
+            )
+        else:
+            QMessageBox.information(self, "Éxito", f"Balance cargado desde:\n{resultado['archivo']}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
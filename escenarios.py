@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+from balance_engine import es_balance_exacto
+
+def _ratio(numerador: np.ndarray, denominador: np.ndarray) -> np.ndarray:
+    # Igual que calcular_ratios: denominador no positivo -> 0.0, redondeo a 2 decimales
+    resultado = np.zeros_like(numerador, dtype="float64")
+    validos = denominador > 0
+    np.divide(numerador, denominador, out=resultado, where=validos)
+    return np.round(resultado, 2)
+
+def evaluar_escenarios(
+    df_balance: pd.DataFrame,
+    shocks: pd.DataFrame,
+    patrimonio_residual: bool = True,
+    exacto: Optional[bool] = None
+) -> pd.DataFrame:
+    # shocks: una fila por escenario y una columna por cuenta (tipo) o categoría, con la variación relativa
+    # (-0.2 = recorte del 20 %). Si un nombre es a la vez tipo y categoría hay que prefijarlo con "tipo:" o
+    # "categoria:". Si una cuenta recibe varios shocks, se suman.
+    # Por defecto el patrimonio de cada escenario es residual (Activos - Pasivos): los shocks sobre activos y
+    # pasivos se trasladan al patrimonio y cada escenario cumple A = P + PN. Si el balance base cuadra, el
+    # escenario sin shocks reproduce calcular_ratios. Con patrimonio_residual=False se usa el patrimonio
+    # registrado (que solo cambia si se le aplica un shock directo), como hace calcular_ratios.
+    required_columns = ["categoria", "tipo", "valor"]
+    if not all(col in df_balance.columns for col in required_columns):
+        raise ValueError("DataFrame must contain 'categoria', 'tipo', 'valor' columns.")
+
+    exacto = es_balance_exacto(df_balance, exacto)
+    cuentas = df_balance[df_balance["categoria"] != "TOTALES"]
+    categorias = cuentas["categoria"].astype(str).str.strip().str.lower().to_numpy()
+    tipos = cuentas["tipo"].astype(str).str.strip().str.lower().to_numpy()
+    base = pd.to_numeric(cuentas["valor"], errors="coerce").fillna(0).to_numpy(dtype="float64")
+    if exacto:
+        base = base / 100
+
+    asignacion = np.zeros((shocks.shape[1], len(base)), dtype="float64")
+    for fila, columna in enumerate(shocks.columns):
+        clave = str(columna).strip().lower()
+        ambito, _, nombre = clave.partition(":")
+        if ambito == "tipo" and nombre:
+            destino = tipos == nombre.strip()
+        elif ambito == "categoria" and nombre:
+            destino = categorias == nombre.strip()
+        else:
+            por_tipo = tipos == clave
+            por_categoria = categorias == clave
+            if por_tipo.any() and por_categoria.any():
+                raise ValueError(f"'{columna}' es a la vez cuenta y categoría; usa 'tipo:{clave}' o 'categoria:{clave}'.")
+            destino = por_tipo if por_tipo.any() else por_categoria
+        if not destino.any():
+            raise ValueError(f"La cuenta o categoría '{columna}' no existe en el balance.")
+        asignacion[fila, destino] = 1.0
+
+    variaciones = shocks.apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+    serie_categorias = pd.Series(categorias)
+    es_activo = serie_categorias.str.contains("activos", regex=False).to_numpy()
+    es_pasivo = serie_categorias.str.contains("pasivos", regex=False).to_numpy()
+    es_corriente = serie_categorias.str.contains("corrientes", regex=False).to_numpy()
+    mascaras = np.column_stack([
+        es_activo,
+        es_pasivo,
+        serie_categorias.str.contains("patrimonio", regex=False).to_numpy(),
+        es_activo & es_corriente,
+        es_pasivo & es_corriente
+    ]).astype("float64")
+    # Los totales son lineales en los shocks: base + variaciones @ (efecto de cada shock en cada total),
+    # así se trabaja con escenarios x shocks y nunca con escenarios x cuentas
+    efecto = (asignacion * base) @ mascaras
+    totales = base @ mascaras + variaciones @ efecto
+    activos, pasivos, patrimonio, activos_corrientes, pasivos_corrientes = totales.T
+    if patrimonio_residual:
+        patrimonio = activos - pasivos
+
+    endeudamiento = _ratio(pasivos, activos)
+    liquidez = _ratio(activos_corrientes, pasivos_corrientes)
+    solvencia = _ratio(patrimonio, activos)
+
+    resultado = pd.DataFrame({
+        "Total Activos": activos,
+        "Total Pasivos": pasivos,
+        "Total Patrimonio": patrimonio,
+        "Endeudamiento": endeudamiento,
+        "Liquidez": liquidez,
+        "Solvencia": solvencia,
+        # Mismos umbrales que generar_diagnostico; 0.0 significa "no calculable", no alerta
+        "endeudamiento_alto": endeudamiento >= 0.5,
+        "liquidez_baja": (liquidez <= 1) & (liquidez != 0.0),
+        "solvencia_negativa": solvencia < 0
+    }, index=shocks.index)
+    resultado["alertas"] = resultado[["endeudamiento_alto", "liquidez_baja", "solvencia_negativa"]].sum(axis=1)
+    return resultado
+
+def resumen_escenarios(resultado: pd.DataFrame) -> pd.DataFrame:
+    alertas = resultado[["endeudamiento_alto", "liquidez_baja", "solvencia_negativa"]]
+    ratios = resultado[["Endeudamiento", "Liquidez", "Solvencia"]]
+    return pd.DataFrame({
+        "minimo": ratios.min(),
+        "mediana": ratios.median(),
+        "maximo": ratios.max(),
+        "escenarios_en_alerta": alertas.sum().to_numpy(),
+        "porcentaje_en_alerta": (alertas.mean().to_numpy() * 100).round(2)
+    })
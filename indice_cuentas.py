@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+LONGITUD_PREFIJO = 12
+
+def normalizar_texto(texto: str) -> str:
+    descompuesto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def tokenizar(texto: str) -> List[str]:
+    return re.findall(r"\w+", normalizar_texto(texto))
+
+class IndiceCuentas:
+    # Índice de prefijos por token: cada búsqueda cuesta lo que miden los conjuntos de resultados,
+    # no el número de filas del plan de cuentas
+    def __init__(self, longitud_prefijo: int = LONGITUD_PREFIJO):
+        self.longitud_prefijo = longitud_prefijo
+        self.prefijos: Dict[str, Set[int]] = {}
+        self.tokens_fila: Dict[int, Set[str]] = {}
+        self.padres: Dict[int, Tuple[int, ...]] = {}
+        self.filas: Set[int] = set()
+        self._ultima_consulta: Optional[str] = None
+        self._ultimo_resultado: Set[int] = set()
+
+    def agregar(self, fila: int, textos: List[str], padres: Tuple[int, ...] = ()) -> None:
+        tokens = set()
+        for texto in textos:
+            tokens.update(tokenizar(texto))
+        self.filas.add(fila)
+        self.tokens_fila[fila] = tokens
+        self.padres[fila] = padres
+        for token in tokens:
+            for largo in range(1, min(len(token), self.longitud_prefijo) + 1):
+                self.prefijos.setdefault(token[:largo], set()).add(fila)
+        self._ultima_consulta = None
+
+    def _buscar_token(self, token: str, candidatas: Optional[Set[int]]) -> Set[int]:
+        coincidencias = self.prefijos.get(token[:self.longitud_prefijo], set())
+        if candidatas is None:
+            coincidencias = set(coincidencias)
+        else:
+            coincidencias = candidatas & coincidencias
+        if len(token) > self.longitud_prefijo:
+            coincidencias = {
+                fila for fila in coincidencias
+                if any(t.startswith(token) for t in self.tokens_fila[fila])
+            }
+        return coincidencias
+
+    def buscar(self, consulta: str) -> Set[int]:
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return set(self.filas)
+
+        # Si la consulta amplía la anterior (el usuario sigue escribiendo) se filtra sobre el resultado previo
+        normalizada = " ".join(tokens)
+        candidatas = None
+        if self._ultima_consulta and normalizada.startswith(self._ultima_consulta):
+            candidatas = self._ultimo_resultado
+
+        # Los tokens más largos suelen ser los más selectivos
+        for token in sorted(tokens, key=len, reverse=True):
+            candidatas = self._buscar_token(token, candidatas)
+            if not candidatas:
+                break
+
+        self._ultima_consulta = normalizada
+        self._ultimo_resultado = candidatas
+        return candidatas
+
+    def filas_visibles(self, consulta: str) -> Set[int]:
+        coincidencias = self.buscar(consulta)
+        visibles = set(coincidencias)
+        for fila in coincidencias:
+            visibles.update(self.padres[fila])
+        return visibles